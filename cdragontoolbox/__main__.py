@@ -246,6 +246,9 @@ def command_export(parser, args):
     storage = args.storage
     overwrite = not args.lazy
     symlinks = bool(args.symlinks)
+    processes = args.processes
+    if processes is not None and processes < 1:
+        parser.error("invalid number of processes")
 
     if not args.patch:
         # multiple patches (update only)
@@ -255,7 +258,7 @@ def command_export(parser, args):
             parser.error("--from is required when no patch is provided")
         exporters = CdragonRawPatchExporter.from_directory(storage, args.output, PatchVersion(args.first), symlinks=symlinks)
         for exporter in exporters:
-            exporter.process(overwrite=overwrite)
+            exporter.process(overwrite=overwrite, processes=processes)
     else:
         if args.first:
             parser.error("--from cannot be used when providing a patch")
@@ -280,7 +283,7 @@ def command_export(parser, args):
                 parser.error("cannot guess previous patch")
 
         exporter = CdragonRawPatchExporter(os.path.join(args.output, str(patch.version)), patch, previous_patch, symlinks=symlinks)
-        exporter.process(overwrite=overwrite)
+        exporter.process(overwrite=overwrite, processes=processes)
 
 
 def command_skn_extract(parser, args):
@@ -436,6 +439,8 @@ def create_parser():
                            help="if a patch is not provided, update all exported patches starting from this one")
     subparser.add_argument('--lazy', action='store_true',
                            help="don't overwrite files, assume they are already correctly extracted")
+    subparser.add_argument('-j', '--processes', type=int,
+                           help="number of processes used to export WAD files (default: number of CPUs)")
     subparser.add_argument('patch', nargs='?',
                            help="patch version to export or 'latest', can be omitted to update all exported patches")
 
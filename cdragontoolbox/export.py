@@ -1,10 +1,16 @@
 import os
+import copy
+import stat
 import errno
 import json
 import re
+import heapq
 import shutil
 import logging
 from io import BytesIO
+from bisect import bisect_left
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from PIL import Image
 
 from .storage import PatchVersion
@@ -13,62 +19,129 @@ from .binfile import BinFile
 from .sknfile import SknFile
 from .rstfile import hashfile_rst, RstFile, key_to_hash as key_to_rsthash
 from .tools import (
+    copy_file_object,
     write_file_or_remove,
     write_dir_or_remove,
 )
 
 logger = logging.getLogger(__name__)
 
+# export path of league_client WADs, capture the plugin directory
+_re_plugin_wad_path = re.compile(r'^(plugins/rcp-.+?)/[^/]*assets\.wad$', re.I)
 
-def paths_to_tree(paths):
-    """Reduce an iterable of paths into nested mappings
 
-    For leafs, value if set to None.
-    There must not be paths empty parts, leading or trailing slashes.
+def parent_dirs(paths):
+    """Return the set of all parent directories of given paths
 
     For instance: ['a/x/1', 'a/2']
-    Is reduced to: {'a': {'x': {'1': None}, '2': None}}
+    Returns: {'a', 'a/x'}
     """
 
-    tree = {}
+    dirs = set()
     for path in paths:
-        *parents, leaf = path.split('/')
-        subtree = tree
-        for parent in parents:
-            subtree = subtree.setdefault(parent, {})
-        subtree[leaf] = None
-    return tree
-
-def reduce_common_trees(parts, tree1, tree2, excludes):
-    """Recursive method for reducing paths"""
-    if tree1 is None or (tree1 == tree2 and excludes is None):
-        # leaf or common, non-excluded subtree
-        yield '/'.join(parts)
-        return
-    for name in tree1:
-        # non-common subtree, compare each subtree
-        # tree2[name] must exist, since tree1 must be a subtree of tree2
-        yield from reduce_common_trees(parts + [name], tree1[name], tree2[name], None if excludes is None else excludes.get(name))
+        i = path.rfind('/')
+        while i != -1:
+            path = path[:i]
+            if path in dirs:
+                break  # upper parents have already been added
+            dirs.add(path)
+            i = path.rfind('/')
+    return dirs
+
+def count_sorted_paths_in_dir(sorted_paths, prefix):
+    """Count paths starting with `prefix`, which must end with a slash"""
+    # '0' follows '/': all paths in the directory are between the two bounds
+    return bisect_left(sorted_paths, prefix[:-1] + '0') - bisect_left(sorted_paths, prefix)
 
 def reduce_common_paths(paths1, paths2, excludes):
     """Compare paths lists and return the most common subpaths
 
     Reduce directories in paths1 that are the same in paths2 so that the
     returned list of paths are common in paths1 and paths2.
-    All paths in paths1 must exist in paths2.
+    All paths in paths1 must exist in paths2, paths must be unique.
+    Directories containing a path from excludes are never reduced.
 
-    If paths lists are identical, return a list of root's subdirs.
+    Returned paths are sorted.
     """
 
-    tree1 = paths_to_tree(paths1)
-    tree2 = paths_to_tree(paths2)
-    tree_excludes = paths_to_tree(excludes)
-    ret = list(reduce_common_trees([], tree1, tree2, tree_excludes))
-    if len(ret) == 1 and ret[0] == '':
-        # trees are identical
-        return list(tree1)
+    # Since paths1 is a subset of paths2, a directory is the same in both if
+    # it contains the same number of paths.
+    # Once sorted, paths of a given directory are contiguous, which allows to
+    # count them with a bisection and to skip them once reduced.
+    sorted_paths1 = sorted(paths1)
+    sorted_paths2 = sorted(paths2)
+    excluded_dirs = parent_dirs(excludes)
+
+    common_dirs = {}  # {prefix: bool}, prefixes have a trailing slash
+    ret = []
+    reduced_prefix = None
+    for path in sorted_paths1:
+        if reduced_prefix is not None and path.startswith(reduced_prefix):
+            continue  # already reduced to a parent
+        # find the top-most parent directory that can be reduced
+        i = path.find('/')
+        while i != -1:
+            prefix = path[:i+1]
+            common = common_dirs.get(prefix)
+            if common is None:
+                common = (prefix[:-1] not in excluded_dirs and
+                          count_sorted_paths_in_dir(sorted_paths1, prefix) == count_sorted_paths_in_dir(sorted_paths2, prefix))
+                common_dirs[prefix] = common
+            if common:
+                break
+            i = path.find('/', i + 1)
+        if i == -1:
+            ret.append(path)
+        else:
+            ret.append(path[:i])
+            reduced_prefix = path[:i+1]
+
+    # reduced directories may not be in order (e.g. 'a/b' was before 'a-/c')
+    ret.sort()
     return ret
 
+def changed_wad_files(files, other_sha256):
+    """Return WAD files from `files` that are different in `other_sha256`
+
+    `other_sha256` is a `{path_hash: sha256}` map of the other WAD.
+    Files are matched by path hash and compared using their sha256.
+    """
+
+    # a single dict lookup per file, it is faster than building and looking
+    # up (path_hash, sha256) tuples
+    get_other_sha256 = other_sha256.get
+    return [wf for wf in files if wf.sha256 != get_other_sha256(wf.path_hash)]
+
+def group_by_common_paths(items, item_paths):
+    """Group items that share at least one path
+
+    `item_paths(item)` returns the paths of an item.
+    Return a list of groups (lists of items). Item order is preserved in each
+    group, groups are sorted by their first item.
+    """
+
+    # union-find, indexed by item position
+    roots = list(range(len(items)))
+    def find(i):
+        while roots[i] != i:
+            roots[i] = roots[roots[i]]
+            i = roots[i]
+        return i
+
+    owners = {}  # {path: index of first item with this path}
+    for i, item in enumerate(items):
+        for path in item_paths(item):
+            j = owners.setdefault(path, i)
+            if j != i:
+                ri, rj = find(i), find(j)
+                if ri != rj:
+                    roots[max(ri, rj)] = min(ri, rj)
+
+    groups = {}
+    for i, item in enumerate(items):
+        groups.setdefault(find(i), []).append(item)
+    return list(groups.values())
+
 
 class Exporter:
     """Export files and WADs to a directory"""
@@ -79,6 +152,16 @@ class Exporter:
         self.plain_files = {}  # {export_path: path}
         self.converters = []
 
+    @property
+    def converters(self):
+        return self._converters
+
+    @converters.setter
+    def converters(self, converters):
+        self._converters = converters
+        # paths are looked up several times (converted paths, export)
+        self._converters_by_path = {}
+
 
     def exported_paths(self):
         """Generate paths of extracted files"""
@@ -103,19 +186,32 @@ class Exporter:
         Don't recurse into directories in `skip_recurse`.
         Generate paths with forward slashes on all platforms.
         """
+        for path, _ in self._scan_output_dir(skip_recurse):
+            yield path
+
+    def _scan_output_dir(self, skip_recurse=None):
+        """Same as walk_output_dir(), but generate `(path, entry)` pairs
+
+        `entry` is the `os.DirEntry` of the path. Its type information is
+        retrieved while reading the directory, so it can be checked without
+        additional syscalls.
+        """
         # os.walk() handles symlinked directories as directories
         # due to this, it's simpler (and faster) to recurse ourselves
         if not os.path.exists(self.output):
             return
+        # paths are checked for each directory: use a set
         if skip_recurse is None:
-            skip_recurse = []
+            skip_recurse = frozenset()
+        elif not isinstance(skip_recurse, (set, frozenset)):
+            skip_recurse = frozenset(skip_recurse)
         to_visit = ['']
         while to_visit:
             base = to_visit.pop()
             with os.scandir(f"{self.output}/{base}") as scan_it:
                 for entry in scan_it:
                     if entry.is_symlink() or entry.is_file(follow_symlinks=False):
-                        yield f"{base}{entry.name}"
+                        yield f"{base}{entry.name}", entry
                     elif entry.is_dir():
                         path = f"{base}{entry.name}"
                         if path not in skip_recurse:
@@ -174,12 +270,11 @@ class Exporter:
                 del self.wads[export_path]
             else:
                 # compare the sha256 hashes to find the common files
-                # don't resolve hashes: we just need the sha256
+                # don't parse the whole WAD: we just need the sha256
                 logger.debug(f"filter modified WAD file: {source_path}")
-                other_wad = Wad(source_path, hashes={})
-                other_sha256 = {wf.path_hash: wf.sha256 for wf in other_wad.files}
+                other_sha256 = Wad.read_sha256(source_path)
                 # change the files from the wad so it only extract these
-                self_wad.files = [wf for wf in self_wad.files if wf.sha256 != other_sha256.get(wf.path_hash)]
+                self_wad.files = changed_wad_files(self_wad.files, other_sha256)
                 if not self_wad.files:
                     del self.wads[export_path]
 
@@ -211,53 +306,130 @@ class Exporter:
             self_wad = self.wads.get(path)
             if self_wad is None:
                 continue  # not exported
-            if self_wad.path == other_wad.path:
-                # same path: WADs are identical
+            if self_wad.path == other_wad.path or self_wad.toc_digest == other_wad.toc_digest:
+                # same path or same file entries: WADs are identical
                 logger.debug(f"filter identical WAD file: {path}")
                 del self.wads[path]
             else:
                 # compare the sha256 hashes to find the common files
-                # don't resolve hashes: we just need the sha256
                 logger.debug(f"filter modified WAD file: {path}")
                 other_sha256 = {wf.path_hash: wf.sha256 for wf in other_wad.files}
                 # change the files from the wad so it only extract these
-                self_wad.files = [wf for wf in self_wad.files if wf.sha256 != other_sha256.get(wf.path_hash)]
+                self_wad.files = changed_wad_files(self_wad.files, other_sha256)
                 if not self_wad.files:
                     del self.wads[path]
 
-    def export(self, overwrite=True):
+    def export(self, overwrite=True, processes=None):
         """Export files to the output
 
         If overwrite is False, don't extract files that already exist on disk.
+
+        WADs are exported in parallel, using up to `processes` worker
+        processes (default: number of CPUs). Plain files are exported from the
+        current process, using up to `processes` threads. If `processes` is 1,
+        everything is exported sequentially.
         """
 
+        if processes is None:
+            processes = os.cpu_count() or 1
+
         logger.info(f"export plain files ({len(self.plain_files)})")
-        for export_path, source_path in self.plain_files.items():
-            self._export_plain_file(export_path, source_path, overwrite)
+        if processes <= 1 or len(self.plain_files) <= 1:
+            for export_path, source_path in self.plain_files.items():
+                self._export_plain_file(export_path, source_path, overwrite)
+        else:
+            # plain files are mostly copied as-is: the work is dominated by
+            # blocking I/Os, which threads allow to overlap
+            # files converted to common paths are exported by the same job, in
+            # order, as when exported sequentially
+            def converted_paths(item):
+                export_path = item[0]
+                return self._get_converter(export_path).converted_paths(export_path)
+            groups = group_by_common_paths(list(self.plain_files.items()), converted_paths)
+            with ThreadPoolExecutor(min(processes, len(groups))) as executor:
+                futures = [executor.submit(self._export_plain_files, group, overwrite) for group in groups]
+                try:
+                    for future in futures:
+                        future.result()  # propagate exceptions
+                except BaseException:
+                    # on error or interruption, don't wait for pending files
+                    executor.shutdown(cancel_futures=True)
+                    raise
 
-        for wad in self.wads.values():
-            self._export_wad(wad, overwrite)
+        wads = list(self.wads.values())
+        if processes <= 1 or len(wads) <= 1:
+            for wad in wads:
+                self._export_wad(wad, overwrite)
+        else:
+            # WAD export is CPU-bound (decompression, conversion), WADs are
+            # exported by worker processes
+            wad_groups = self._parallel_wad_groups(wads, overwrite)
+            nworkers = min(processes, len(wad_groups))
+            initargs = (self.output, self.converters)
+            with ProcessPoolExecutor(nworkers, initializer=_init_wad_worker, initargs=initargs) as executor:
+                # consume results to propagate exceptions
+                # note: on error, map() cancels pending WADs itself
+                for _ in executor.map(_export_wads_worker, wad_groups, repeat(overwrite)):
+                    pass
+
+    def _parallel_wad_groups(self, wads, overwrite=True):
+        """Split WADs into groups that can be exported in parallel
+
+        When exported sequentially, a file from a WAD overrides the same file
+        from a previous WAD (or is skipped if overwrite is False). Keep this
+        rule: overridden (or skipped) files are not exported. WADs still
+        writing to common paths (e.g. 'x.dds' and 'x.tga', both converted to
+        'x.png') are put in the same group, to be exported sequentially, in
+        order.
+
+        WADs are not modified, copies are returned if needed.
+        """
+
+        # remove overridden files
+        dedup_wads = []
+        seen_paths = set()
+        for wad in (reversed(wads) if overwrite else wads):
+            files = [wf for wf in wad.files if wf.path not in seen_paths]
+            seen_paths.update(wf.path for wf in wad.files)
+            if len(files) != len(wad.files):
+                wad = copy.copy(wad)
+                wad.files = files
+            if wad.files:
+                dedup_wads.append(wad)
+        if overwrite:
+            dedup_wads.reverse()
+
+        def wad_converted_paths(wad):
+            for wf in wad.files:
+                if wf.path is not None:
+                    yield from self._get_converter(wf.path).converted_paths(wf.path)
+
+        return group_by_common_paths(dedup_wads, wad_converted_paths)
 
     def clean_output_dir(self, kept_files, kept_symlinks):
         """Remove regular files (or directories) and symlinks from output, except given ones
 
         This method is intended to be used to clean-up files that should not be
-        extracted/symlinked. Parent directories are removed (if empty).
+        extracted/symlinked. Parent directories are removed (if empty), up to
+        the output directory.
         Note: symlinks are assumed to point to the right location.
+
+        Kept files and symlinks are looked up for each file on disk: they
+        should be sets.
         """
 
         # collect files to remove
         # note: empty directories are not removed
         trees_to_remove = []
         files_to_remove = []
-        for path in self.walk_output_dir(kept_files):
+        for path, entry in self._scan_output_dir(kept_files):
             full_path = os.path.join(self.output, path)
-            if os.path.islink(full_path):
+            if entry.is_symlink():
                 if path not in kept_symlinks:
                     files_to_remove.append(full_path)
             else:
                 if path not in kept_files:
-                    if os.path.isdir(full_path):
+                    if entry.is_dir(follow_symlinks=False):
                         trees_to_remove.append(full_path)
                     else:
                         files_to_remove.append(full_path)
@@ -272,19 +444,35 @@ class Exporter:
             shutil.rmtree(path)
             dirs_to_remove.add(os.path.dirname(path))
 
-        for path in dirs_to_remove:
+        # Remove emptied directories, up to the output directory (excluded).
+        # Process deepest directories first (a child is longer than its
+        # parent), so that common parents are tried only once.
+        dirs_to_remove.discard(self.output)
+        dirs_heap = [(-len(path), path) for path in dirs_to_remove]
+        heapq.heapify(dirs_heap)
+        while dirs_heap:
+            _, path = heapq.heappop(dirs_heap)
             try:
-                os.removedirs(path)
+                os.rmdir(path)
             except OSError:
-                pass
+                continue  # not empty
+            parent = os.path.dirname(path)
+            if parent != self.output and parent not in dirs_to_remove:
+                dirs_to_remove.add(parent)
+                heapq.heappush(dirs_heap, (-len(parent), parent))
 
 
     def _get_converter(self, path):
-        """Get converter that handles the given path, or None"""
-        for converter in self.converters:
-            if converter.is_handled(path):
-                return converter
-        return CopyConverter.singleton
+        """Get converter that handles the given path"""
+        converter = self._converters_by_path.get(path)
+        if converter is None:
+            for converter in self._converters:
+                if converter.is_handled(path):
+                    break
+            else:
+                converter = CopyConverter.singleton
+            self._converters_by_path[path] = converter
+        return converter
 
     def _export_plain_file(self, export_path, source_path, overwrite=True):
         """Export a plain file"""
@@ -299,12 +487,21 @@ class Exporter:
         except FileConversionError as e:
             logger.warning(f"cannot convert file '{source_path}': {e}")
 
+    def _export_plain_files(self, files, overwrite=True):
+        """Export a list of `(export_path, source_path)` plain files, in order"""
+        for export_path, source_path in files:
+            self._export_plain_file(export_path, source_path, overwrite)
+
     def _export_wad(self, wad, overwrite=True):
         logger.info(f"export {wad.path} ({len(wad.files)})")
         # similar to Wad.extract()
         # unknown files are skipped
         with open(wad.path, 'rb') as fwad:
-            for wadfile in wad.files:
+            # read files in data order, so that reads are sequential and
+            # benefit from the kernel's readahead
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(fwad.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            for wadfile in sorted(wad.files, key=lambda wf: wf.offset):
                 if wadfile.path is None:
                     continue
 
@@ -328,6 +525,21 @@ class Exporter:
                         raise
 
 
+# Exporter of the current worker process, see Exporter.export()
+_worker_exporter = None
+
+def _init_wad_worker(output, converters):
+    """Initialize a worker process used to export WADs"""
+    global _worker_exporter
+    _worker_exporter = Exporter(output)
+    _worker_exporter.converters = converters
+
+def _export_wads_worker(wads, overwrite):
+    """Export WADs, in order, from a worker process"""
+    for wad in wads:
+        _worker_exporter._export_wad(wad, overwrite)
+
+
 class CdragonRawPatchExporter:
     """Export a single patch, as on raw.communitydragon.org
 
@@ -346,7 +558,12 @@ class CdragonRawPatchExporter:
                 raise ValueError("cannot create symlinks without a previous patch")
             self.create_symlinks = symlinks
 
-    def process(self, overwrite=True):
+    def process(self, overwrite=True, processes=None):
+        """Export the patch
+
+        `overwrite` and `processes` are passed to `Exporter.export()`.
+        """
+
         exporter = self._create_exporter(self.patch)
 
         # collect unknown hashes before resolving and filtering anything
@@ -364,11 +581,12 @@ class CdragonRawPatchExporter:
         symlinked_paths = None
         changed_paths = new_paths  # default: use all new paths
         if self.prev_patch:
-            prev_paths = set(prev_exporter.converted_exported_paths())
             # filter out files from previous patch
             exporter.filter_exporter(prev_exporter)
             # collect a list of new paths to actually extract (changed ones)
             if self.create_symlinks:
+                # previous paths are only needed to build symlinks
+                prev_paths = set(prev_exporter.converted_exported_paths())
                 changed_paths = set(exporter.converted_exported_paths())
                 # build a list of symlinks
                 # note: Game files contain some duplicates which will appear in several WAD files.
@@ -380,25 +598,24 @@ class CdragonRawPatchExporter:
         exporter.clean_output_dir(changed_paths, set(symlinked_paths or []))
 
         # extract files, create symlinks if needed
-        exporter.export(overwrite=overwrite)
+        exporter.export(overwrite=overwrite, processes=processes)
         if symlinked_paths:
             self._create_symlinks(symlinked_paths)
 
         # write additional txt files
         os.makedirs(os.path.join(self.output, "cdragon"), exist_ok=True)
 
+        # note: lists are written at once, print() is slow for large lists
         if symlinked_paths:
+            # paths returned by reduce_common_paths() are already sorted
             with open(os.path.join(self.output, "cdragon/files.links.txt"), 'w', newline='\n') as f:
-                for link in sorted(symlinked_paths):
-                    print(link, file=f)
+                f.write(''.join(f"{link}\n" for link in symlinked_paths))
 
         with open(os.path.join(self.output, "cdragon/files.unknown.txt"), 'w', newline='\n') as f:
-            for h in unknown_hashes:
-                print(f"{h:016x}", file=f)
+            f.write(''.join(f"{h:016x}\n" for h in unknown_hashes))
 
         with open(os.path.join(self.output, "cdragon/files.exported.txt"), 'w', newline='\n') as f:
-            for path in sorted(new_paths):
-                print(path, file=f)
+            f.write(''.join(f"{path}\n" for path in sorted(new_paths)))
 
         logger.info(f"export TFT data files")
         self.export_tft_data()
@@ -435,7 +652,7 @@ class CdragonRawPatchExporter:
         for path, wad in exporter.wads.items():
             unknown_path = "unknown"
             # league_client: extract unknown files under plugin directory
-            m = re.search(r'^(plugins/rcp-.+?)/[^/]*assets\.wad$', path, re.I)
+            m = _re_plugin_wad_path.match(path)
             if m is not None:
                 unknown_path = f"{m.group(1).lower()}/unknown"
             wad.set_unknown_paths(unknown_path)
@@ -479,15 +696,36 @@ class CdragonRawPatchExporter:
         src_output = os.path.join(os.path.dirname(self.output), str(self.prev_patch.version))
 
         logger.info(f"creating symlinks for patch {self.patch.version}")
+        # Resolved directories are cached to limit syscalls: realpath() calls
+        # lstat() on each path component.
+        real_src_dirs = {}
+        real_dst_dirs = {}  # also used to create each directory only once
         for link in symlinks:
             dst = os.path.join(dst_output, link)
-            if os.path.lexists(dst):
-                if not os.path.islink(dst):
+            try:
+                dst_stat = os.lstat(dst)
+            except OSError:
+                pass
+            else:
+                if not stat.S_ISLNK(dst_stat.st_mode):
                     raise RuntimeError(f"symlink target already exists: {dst}")
                 continue  # already set
+
             dst_dir = os.path.dirname(dst)
-            os.makedirs(dst_dir, exist_ok=True)
-            src = os.path.relpath(os.path.realpath(os.path.join(src_output, link)), os.path.realpath(dst_dir))
+            real_dst_dir = real_dst_dirs.get(dst_dir)
+            if real_dst_dir is None:
+                os.makedirs(dst_dir, exist_ok=True)
+                real_dst_dir = real_dst_dirs[dst_dir] = os.path.realpath(dst_dir)
+
+            src_dir, src_name = os.path.split(os.path.join(src_output, link))
+            real_src_dir = real_src_dirs.get(src_dir)
+            if real_src_dir is None:
+                real_src_dir = real_src_dirs[src_dir] = os.path.realpath(src_dir)
+            real_src = os.path.join(real_src_dir, src_name)
+            if os.path.islink(real_src):
+                real_src = os.path.realpath(real_src)
+
+            src = os.path.relpath(real_src, real_dst_dir)
             logger.info(f"create symlink {dst}")
             try:
                 os.symlink(src, dst)
@@ -510,14 +748,16 @@ class CdragonRawPatchExporter:
 
         # collect all version subdirectories
         versions = set()
-        for path in os.listdir(output):
-            if not os.path.isdir(os.path.join(output, path)):
-                continue
-            try:
-                version = PatchVersion(path)
-            except (ValueError, TypeError):
-                continue
-            versions.add(version)
+        with os.scandir(output) as scan_it:
+            for entry in scan_it:
+                # note: use directory entry type, don't stat() each entry
+                if not entry.is_dir():
+                    continue
+                try:
+                    version = PatchVersion(entry.name)
+                except (ValueError, TypeError):
+                    continue
+                versions.add(version)
 
         if not versions:
             return []  # no version directory found
@@ -596,7 +836,7 @@ class CopyConverter(FileConverter):
     def convert(self, fin, output, path):
         output_path = os.path.join(output, path)
         with write_file_or_remove(output_path) as fout:
-            shutil.copyfileobj(fin, fout)
+            copy_file_object(fin, fout)
 
 # use as a singleton, to avoid multiple instanciations for nothing
 CopyConverter.singleton = CopyConverter()
@@ -636,7 +876,7 @@ class BinConverter(FileConverter):
     def convert(self, fin, output, path):
         output_path = os.path.join(output, path)
         with write_file_or_remove(output_path) as fout:
-            shutil.copyfileobj(fin, fout)
+            copy_file_object(fin, fout)
         with write_file_or_remove(output_path + '.json') as fout:
             try:
                 binfile = BinFile(output_path, btype_version=self.btype_version)
@@ -658,7 +898,7 @@ class SknConverter(FileConverter):
     def convert(self, fin, output, path):
         output_path = os.path.join(output, path)
         with write_file_or_remove(output_path) as fout:
-            shutil.copyfileobj(fin, fout)
+            copy_file_object(fin, fout)
         obj_output_path = os.path.join(output, os.path.splitext(path)[0])
         shutil.rmtree(obj_output_path, ignore_errors=True)
         with write_dir_or_remove(obj_output_path):
@@ -672,6 +912,8 @@ class RstConverter(FileConverter):
     def __init__(self, regex):
         self.regex = regex
         self.hashes = hashfile_rst.load()
+        # hashes truncated to RST hash bits, computed once for all RST files
+        self._hashes_by_bits = {}  # {hash_bits: {truncated_hash: key}}
 
     def is_handled(self, path):
         return self.regex.search(path) is not None
@@ -683,10 +925,10 @@ class RstConverter(FileConverter):
     def convert(self, fin, output, path):
         output_path = os.path.join(output, path)
         with write_file_or_remove(output_path) as fout:
-            shutil.copyfileobj(fin, fout)
+            copy_file_object(fin, fout)
 
         rstfile = RstFile(output_path)
-        hashes = {key_to_rsthash(hash, rstfile.hash_bits): value for hash, value in self.hashes.items()}
+        hashes = self._truncated_hashes(rstfile.hash_bits)
         rst_json = {"entries": {}, "version": rstfile.version}
         for key, value in rstfile.entries.items():
             if key in hashes:
@@ -697,3 +939,10 @@ class RstConverter(FileConverter):
 
         with write_file_or_remove(output_path + '.json', False) as fout:
             fout.write(json.dumps(rst_json, ensure_ascii=False))
+
+    def _truncated_hashes(self, hash_bits):
+        hashes = self._hashes_by_bits.get(hash_bits)
+        if hashes is None:
+            hashes = {key_to_rsthash(hash, hash_bits): value for hash, value in self.hashes.items()}
+            self._hashes_by_bits[hash_bits] = hashes
+        return hashes
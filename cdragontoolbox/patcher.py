@@ -56,10 +56,8 @@ class PatcherFile:
 
     def hexdigest(self):
         """Compute a hash unique for this file content"""
-        m = hashlib.sha1()
-        for chunk in self.chunks:
-            m.update(b"%016X" % chunk.chunk_id)
-        return m.hexdigest()
+        # hash all chunk IDs at once, in a single call to the C implementation
+        return hashlib.sha1(b"".join(b"%016X" % chunk.chunk_id for chunk in self.chunks)).hexdigest()
 
     @staticmethod
     def langs_predicate(langs):
@@ -658,6 +656,10 @@ class MultiPatcherStorage(Storage):
             raise ValueError("no channels")
         super().__init__(path, PatcherStorage.URL_BASE)
         self.substorages = [PatcherStorage(path, channel) for channel in channels]
+        # share a single session, so that connections to the same hosts are
+        # reused instead of being opened again for each channel
+        for storage in self.substorages:
+            storage.s = self.s
 
     @classmethod
     def from_conf_data(cls, conf):
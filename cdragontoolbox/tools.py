@@ -1,7 +1,12 @@
 import os
+import io
 import shutil
 import struct
 from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # not available on Windows
 
 import zstd
 # support both zstd and zstandard implementations
@@ -17,9 +22,16 @@ def write_file_or_remove(path, binary=True):
 
     If the writing fails, the file is removed.
     """
+    mode = 'wb' if binary else 'w'
     try:
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'wb' if binary else 'w') as f:
+        try:
+            f = open(path, mode)
+        except FileNotFoundError:
+            # parent directory is usually there already, only create it
+            # when needed to save syscalls
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            f = open(path, mode)
+        with f:
             yield f
     except:
         # remove partially written file
@@ -29,6 +41,54 @@ def write_file_or_remove(path, binary=True):
             pass
         raise
 
+# ioctl() request to share data between files (reflink), see ioctl_ficlone(2)
+FICLONE = 0x40049409
+
+def copy_file_object(fin, fout):
+    """Copy data from a file object to another one
+
+    Copy of regular files is done by the kernel if possible: using a reflink
+    (copy-on-write filesystems), or with copy_file_range(). Otherwise, or if
+    files are not at their beginning, it's similar to `shutil.copyfileobj()`.
+    """
+
+    try:
+        fd_in = fin.fileno()
+        fd_out = fout.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        shutil.copyfileobj(fin, fout)
+        return
+    if fin.tell() != 0 or fout.tell() != 0:
+        shutil.copyfileobj(fin, fout)
+        return
+
+    fout.flush()
+    if fcntl is not None:
+        try:
+            fcntl.ioctl(fd_out, FICLONE, fd_in)
+            return
+        except OSError:
+            pass  # not supported by the filesystem
+
+    if hasattr(os, 'copy_file_range'):
+        copied = 0
+        try:
+            while True:
+                n = os.copy_file_range(fd_in, fd_out, 1 << 30)
+                if n == 0:
+                    if copied:
+                        return
+                    # copy_file_range() may silently fail on some filesystems,
+                    # an empty source file will be handled by the fallback
+                    break
+                copied += n
+        except OSError:
+            if copied:
+                raise
+            # nothing copied (e.g. not supported): fallback
+
+    shutil.copyfileobj(fin, fout)
+
 @contextmanager
 def write_dir_or_remove(path):
     """Create a directory for writing, and its parent directory if needed
@@ -5,6 +5,7 @@ import gzip
 import json
 import imghdr
 import logging
+from xxhash import xxh64_intdigest
 
 from .hashes import default_hashfile
 from .tools import (
@@ -152,6 +153,7 @@ class Wad:
         self.path = path
         self.version = None
         self.files = None
+        self.toc_digest = None
         self.parse_headers()
         self.resolve_paths(hashes)
 
@@ -160,27 +162,54 @@ class Wad:
 
         logger.debug(f"parse headers of {self.path}")
         with open(self.path, 'rb') as f:
-            parser = BinaryParser(f)
-            magic, version_major, version_minor = parser.unpack("<2sBB")
-            if magic != b'RW':
-                raise ValueError("invalid magic code")
-            self.version = (version_major, version_minor)
-
-            if version_major == 1:
-                parser.seek(8)
-            elif version_major == 2:
-                parser.seek(100)
-            elif version_major == 3:
-                parser.seek(268)
-            else:
-                raise ValueError(f"unsupported WAD version: {version_major}.{version_minor}")
+            self.version, toc = self._read_toc(f)
+        # file entries include a checksum of file data: WADs with the same
+        # entries have the same content
+        self.toc_digest = xxh64_intdigest(toc)
+        entry_format = "<QIIII" if self.version[0] == 1 else "<QIIIBBBBQ"
+        self.files = [WadFileHeader(*fields) for fields in struct.iter_unpack(entry_format, toc)]
 
-            entry_count, = parser.unpack("<I")
+    @staticmethod
+    def read_sha256(path):
+        """Read sha256 of files from a WAD, return a `{path_hash: sha256}` map
 
-            if version_major == 1:
-                self.files = [WadFileHeader(*parser.unpack("<QIIII")) for _ in range(entry_count)]
-            else:
-                self.files = [WadFileHeader(*parser.unpack("<QIIIBBBBQ")) for _ in range(entry_count)]
+        This is much faster than parsing the whole WAD, since no
+        `WadFileHeader` instance is created. sha256 are not available for
+        WAD v1, they are set to None.
+        """
+
+        with open(path, 'rb') as f:
+            version, toc = Wad._read_toc(f)
+        if version[0] == 1:
+            return dict.fromkeys(h for h, in struct.iter_unpack("<Q16x", toc))
+        else:
+            # skip sizes, offset, type, etc. to only read path hash and sha256
+            return dict(struct.iter_unpack("<Q16xQ", toc))
+
+    @staticmethod
+    def _read_toc(f):
+        """Read WAD version and raw file entries from a WAD file object"""
+
+        parser = BinaryParser(f)
+        magic, version_major, version_minor = parser.unpack("<2sBB")
+        if magic != b'RW':
+            raise ValueError("invalid magic code")
+
+        if version_major == 1:
+            parser.seek(8)
+        elif version_major == 2:
+            parser.seek(100)
+        elif version_major == 3:
+            parser.seek(268)
+        else:
+            raise ValueError(f"unsupported WAD version: {version_major}.{version_minor}")
+
+        entry_count, = parser.unpack("<I")
+        entry_size = 24 if version_major == 1 else 32
+        toc = parser.raw(entry_count * entry_size)
+        if len(toc) != entry_count * entry_size:
+            raise ValueError("truncated WAD file entries")
+        return (version_major, version_minor), toc
 
     def resolve_paths(self, hashes=None):
         """Guess path of files"""
@@ -194,7 +223,7 @@ class Wad:
 
     def guess_extensions(self):
         # avoid opening the file if not needed
-        unknown_ext = True
+        unknown_ext = False
         for wadfile in self.files:
             if not wadfile.path and not wadfile.ext:
                 wadfile.ext = _hash_to_guessed_extensions.get(wadfile.path_hash)
@@ -203,14 +232,17 @@ class Wad:
         if not unknown_ext:
             return  # all extensions are known
 
+        # note: failed guesses are only cached for this WAD, data may differ in other ones
+        guessed = {}
         with open(self.path, 'rb') as f:
             for wadfile in self.files:
                 if not wadfile.path and not wadfile.ext:
-                    data = wadfile.read_data(f)
-                    if not data:
-                        continue
-                    wadfile.ext = WadFileHeader.guess_extension(data)
-                    _hash_to_guessed_extensions[wadfile.path_hash] = wadfile.ext
+                    if wadfile.path_hash not in guessed:
+                        data = wadfile.read_data(f)
+                        guessed[wadfile.path_hash] = WadFileHeader.guess_extension(data) if data else None
+                    wadfile.ext = guessed[wadfile.path_hash]
+                    if wadfile.ext:
+                        _hash_to_guessed_extensions[wadfile.path_hash] = wadfile.ext
 
     def set_unknown_paths(self, path):
         """Set a path for files without one"""
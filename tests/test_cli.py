@@ -40,12 +40,13 @@ def runner(storage):
     return _runner
 
 
-@pytest.mark.parametrize("args, version, previous_version", [
-    ("7.24", '7.24', '7.23'),
-    ("7.24 --previous 7.22", '7.24', '7.22'),
-    ("7.24 --full", '7.24', None),
+@pytest.mark.parametrize("args, version, previous_version, processes", [
+    ("7.24", '7.24', '7.23', None),
+    ("7.24 --previous 7.22", '7.24', '7.22', None),
+    ("7.24 --full", '7.24', None, None),
+    ("7.24 -j 2", '7.24', '7.23', 2),
 ])
-def test_cli_export_versions(runner, storage, monkeypatch, mocker, args, version, previous_version):
+def test_cli_export_versions(runner, storage, monkeypatch, mocker, args, version, previous_version, processes):
     def fake_patch(version):
         return Patch._create([PatchElement('game', PatchVersion(version))])
 
@@ -65,5 +66,11 @@ def test_cli_export_versions(runner, storage, monkeypatch, mocker, args, version
         previous_patch = None if previous_version is None else fake_patch(previous_version)
         mock.assert_called_once_with(os.path.join('export', '7.24'), patch, previous_patch, symlinks=False)
 
-        mock_instance.process.assert_called_once_with(overwrite=True)
+        mock_instance.process.assert_called_once_with(overwrite=True, processes=processes)
 
+
+def test_cli_export_invalid_processes(runner, mocker):
+    with mocker.patch('cdragontoolbox.__main__.CdragonRawPatchExporter'):
+        with pytest.raises(SystemExit):
+            runner("export 7.24 -j 0")
+        cdragontoolbox.__main__.CdragonRawPatchExporter.assert_not_called()
@@ -1,4 +1,6 @@
 import pytest
+from tools import make_wad
+from cdragontoolbox.wad import Wad, WadFileHeader
 import cdragontoolbox.export as cdtb_export
 
 
@@ -12,6 +14,10 @@ _test_reduce_common_paths_arg_values = [
      ['common/a/x', 'common/a/y', 'common/b/x', 'common/b/y'],
      ['common/a/z'],
      ['common/a/x', 'common/a/y', 'common/b']),
+    (['a/x', 'a-/x/1', 'a.b/1'],
+     ['a/x', 'a/y', 'a-/x/1', 'a.b/1', 'a.b/2'],
+     [],
+     ['a-', 'a.b/1', 'a/x']),
 ]
 
 @pytest.mark.parametrize("paths1, paths2, excludes, expected", _test_reduce_common_paths_arg_values)
@@ -19,3 +25,60 @@ def test_reduce_common_paths(paths1, paths2, excludes, expected):
     got = cdtb_export.reduce_common_paths(paths1, paths2, excludes)
     assert got == expected
 
+
+def test_changed_wad_files():
+    def wf(path_hash, sha256):
+        return WadFileHeader(path_hash, 0, 0, 0, 0, sha256=sha256)
+    files = [wf(1, 10), wf(2, 20), wf(3, 30)]
+    other_sha256 = {1: 10, 2: 21, 4: 40}
+    got = cdtb_export.changed_wad_files(files, other_sha256)
+    assert [f.path_hash for f in got] == [2, 3]
+
+
+@pytest.mark.parametrize("overwrite, expected", [
+    (True, b"wad3"),
+    (False, b"wad0"),
+])
+def test_export_wads_duplicate_paths(tmp_path, overwrite, expected):
+    exporter = cdtb_export.Exporter(str(tmp_path / "export"))
+    for i in range(4):
+        wad_path = str(tmp_path / f"{i}.wad")
+        make_wad(wad_path, [(1, b"wad%d" % i), (10 + i, b"other")])
+        wad = Wad(wad_path, hashes={})
+        for wf in wad.files:
+            wf.path = "dup.bin" if wf.path_hash == 1 else f"{wf.path_hash}.bin"
+        exporter.wads[f"{i}.wad"] = wad
+
+    # only one WAD exports the duplicate file
+    groups = exporter._parallel_wad_groups(list(exporter.wads.values()), overwrite)
+    dup_wads = [wad for group in groups for wad in group if any(wf.path == "dup.bin" for wf in wad.files)]
+    assert len(dup_wads) == 1
+
+    exporter.export(overwrite=overwrite, processes=2)
+
+    # same result as a sequential export
+    assert (tmp_path / "export" / "dup.bin").read_bytes() == expected
+    for i in range(4):
+        assert (tmp_path / "export" / f"{10 + i}.bin").read_bytes() == b"other"
+    # exported WADs are not modified
+    assert all(len(wad.files) == 2 for wad in exporter.wads.values())
+
+def test_group_by_common_paths():
+    items = [['a', 'b'], ['c'], ['d', 'b'], ['e'], ['c', 'f']]
+    got = cdtb_export.group_by_common_paths(items, lambda item: item)
+    assert got == [[['a', 'b'], ['d', 'b']], [['c'], ['c', 'f']], [['e']]]
+
+def test_export_plain_files_common_converted_paths(tmp_path):
+    exporter = cdtb_export.Exporter(str(tmp_path / "export"))
+    exporter.converters = [cdtb_export.ImageConverter(('.dds', '.tga'))]
+    for ext in ('dds', 'tga', 'txt'):
+        (tmp_path / f"x.{ext}").write_bytes(b"data")
+        exporter.plain_files[f"x.{ext}"] = str(tmp_path / f"x.{ext}")
+
+    # 'x.dds' and 'x.tga' are both converted to 'x.png'
+    items = list(exporter.plain_files.items())
+    groups = cdtb_export.group_by_common_paths(items, lambda item: exporter._get_converter(item[0]).converted_paths(item[0]))
+    assert groups == [items[:2], items[2:]]
+
+    exporter.export(processes=2)
+    assert (tmp_path / "export" / "x.txt").read_bytes() == b"data"
@@ -0,0 +1,37 @@
+import io
+import os
+import pytest
+import cdragontoolbox.tools as cdtb_tools
+from cdragontoolbox.tools import copy_file_object
+
+
+def copy_file(src, dst):
+    with open(src, 'rb') as fin, open(dst, 'wb') as fout:
+        copy_file_object(fin, fout)
+
+@pytest.mark.parametrize("data", [b"", b"data", os.urandom(300000)])
+def test_copy_file_object_regular_files(tmp_path, data):
+    (tmp_path / "src").write_bytes(data)
+    copy_file(tmp_path / "src", tmp_path / "dst")
+    assert (tmp_path / "dst").read_bytes() == data
+
+@pytest.mark.parametrize("data", [b"", b"data"])
+def test_copy_file_object_copy_file_range_fallback(tmp_path, monkeypatch, data):
+    # no reflink, copy_file_range() silently failing
+    monkeypatch.setattr(cdtb_tools, 'fcntl', None)
+    monkeypatch.setattr(os, 'copy_file_range', lambda *args: 0, raising=False)
+    (tmp_path / "src").write_bytes(data)
+    copy_file(tmp_path / "src", tmp_path / "dst")
+    assert (tmp_path / "dst").read_bytes() == data
+
+def test_copy_file_object_bytesio(tmp_path):
+    with open(tmp_path / "dst", 'wb') as fout:
+        copy_file_object(io.BytesIO(b"data"), fout)
+    assert (tmp_path / "dst").read_bytes() == b"data"
+
+def test_copy_file_object_not_at_start(tmp_path):
+    (tmp_path / "src").write_bytes(b"0123456789")
+    with open(tmp_path / "src", 'rb') as fin, open(tmp_path / "dst", 'wb') as fout:
+        fin.read(4)
+        copy_file_object(fin, fout)
+    assert (tmp_path / "dst").read_bytes() == b"456789"
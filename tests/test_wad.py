@@ -0,0 +1,55 @@
+import pytest
+from tools import make_wad
+from cdragontoolbox.wad import Wad
+
+
+@pytest.mark.parametrize("version", [1, 3])
+def test_wad_read_sha256(tmp_path, version):
+    path = str(tmp_path / "test.wad")
+    make_wad(path, [(0x1234, b"first"), (0xfedcba9876543210, b"second"), (42, b"")], version=version)
+
+    wad = Wad(path, hashes={})
+    assert wad.version == (version, 0)
+    with open(path, 'rb') as f:
+        assert [wf.read_data(f) for wf in wad.files] == [b"first", b"second", b""]
+    expected = {wf.path_hash: wf.sha256 for wf in wad.files}
+    assert Wad.read_sha256(path) == expected
+    assert list(expected) == [0x1234, 0xfedcba9876543210, 42]
+    if version == 1:
+        assert all(v is None for v in expected.values())
+    else:
+        assert len(set(expected.values())) == 3
+
+@pytest.mark.parametrize("version", [1, 3])
+def test_wad_truncated_toc(tmp_path, version):
+    path = tmp_path / "test.wad"
+    make_wad(str(path), [(1, b""), (2, b"")], version=version)
+    # remove the end of the last file entry (files are empty)
+    path.write_bytes(path.read_bytes()[:-5])
+
+    with pytest.raises(ValueError):
+        Wad.read_sha256(str(path))
+    with pytest.raises(ValueError):
+        Wad(str(path), hashes={})
+
+def test_wad_guess_extensions(tmp_path, monkeypatch):
+    monkeypatch.setattr("cdragontoolbox.wad._hash_to_guessed_extensions", {})
+    path1 = str(tmp_path / "test1.wad")
+    make_wad(path1, [(1, b'{"a": 1}'), (2, b""), (1, b'{"a": 1}')])
+    path2 = str(tmp_path / "test2.wad")
+    make_wad(path2, [(2, b'{"b": 2}')])
+
+    wad = Wad(path1, hashes={})
+    wad.guess_extensions()
+    assert [wf.ext for wf in wad.files] == ["json", None, "json"]
+
+    # failed guesses don't prevent guessing from other WADs
+    wad = Wad(path2, hashes={})
+    wad.guess_extensions()
+    assert [wf.ext for wf in wad.files] == ["json"]
+
+    # all extensions are cached: the WAD is not opened again
+    wad = Wad(path2, hashes={})
+    monkeypatch.setattr("builtins.open", None)
+    wad.guess_extensions()
+    assert [wf.ext for wf in wad.files] == ["json"]
@@ -1,3 +1,5 @@
+import struct
+import hashlib
 import requests
 
 def count_calls(f):
@@ -14,3 +16,32 @@ def mock_response(content=None, status_code=200):
     r._content = content
     return r
 
+
+def make_wad(path, entries, version=3):
+    """Write a minimal WAD file, with uncompressed files
+
+    `entries` is a list of `(path_hash, data)` pairs.
+    """
+    if version == 1:
+        header = struct.pack('<2sBB4x', b'RW', 1, 0)
+        entry_size = 24
+    elif version == 3:
+        header = struct.pack('<2sBB264x', b'RW', 3, 0)
+        entry_size = 32
+    else:
+        raise ValueError(f"unsupported WAD version: {version}")
+
+    offset = len(header) + 4 + entry_size * len(entries)
+    toc = b''
+    for path_hash, data in entries:
+        if version == 1:
+            toc += struct.pack('<QIIII', path_hash, offset, len(data), len(data), 0)
+        else:
+            checksum = int.from_bytes(hashlib.sha256(data).digest()[:8], 'little')
+            toc += struct.pack('<QIIIBBBBQ', path_hash, offset, len(data), len(data), 0, 0, 0, 0, checksum)
+        offset += len(data)
+
+    with open(path, 'wb') as f:
+        f.write(header + struct.pack('<I', len(entries)) + toc)
+        for _, data in entries:
+            f.write(data)